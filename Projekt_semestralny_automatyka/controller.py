@@ -1,42 +1,96 @@
+import json
+import time
+
 import numpy as np
-from scipy.optimize import minimize
+from scipy.optimize import minimize, root
+
+
+# Względne wagi kosztu przegrzania [CPU, GPU, AIR, RAM]
+THERMAL_WEIGHTS = np.array([1.0, 1.0, 0.5, 0.3])
+
+
+class DeadlineExceeded(Exception):
+    pass
+
 
 class Controller:
     def __init__(self, p):
         self.p = p
+        self.u_plan = None  # ostatni plan MPC [N x 3] - punkt startowy kolejnej optymalizacji
+
+        # MPC wyzwalane zdarzeniami
+        self.plan_index = 0     # liczba wykonanych kroków bieżącego planu
+        self.T_pred = None      # przewidywana trajektoria stanu dla planu [N x 4]
+        self.plan_Q = None      # obciążenia, dla których wyznaczono plan
+        self.last_solved = False
+
+        # MPC z ograniczonym czasem obliczeń i zapasowym regulatorem PI
+        self.pi_integral = np.zeros(3)
+        self.last_fallback = False
+        self.last_deadline_miss = False
+        self.last_latency = 0.0
+
+        # MPC próbkujące (MPPI / CEM) - rozkład próbkowania przechodzi między krokami
+        self.rng = np.random.default_rng(p.sampling_seed)
+        self.sample_sigma = None  # odchylenie standardowe próbek [N x 3]
+
+    def get_state(self):
+        # Stan regulatora do zapisu w punkcie kontrolnym (None -> pusta tablica)
+        return {
+            "u_plan": np.empty(0) if self.u_plan is None else self.u_plan,
+            "T_pred": np.empty(0) if self.T_pred is None else self.T_pred,
+            "plan_Q": np.empty(0) if self.plan_Q is None else self.plan_Q,
+            "plan_index": self.plan_index,
+            "pi_integral": self.pi_integral,
+            "sample_sigma": np.empty(0) if self.sample_sigma is None else self.sample_sigma,
+            "rng_state": np.array(json.dumps(self.rng.bit_generator.state)),
+        }
+
+    def set_state(self, state):
+        self.u_plan = state["u_plan"] if state["u_plan"].size else None
+        self.T_pred = state["T_pred"] if state["T_pred"].size else None
+        self.plan_Q = state["plan_Q"] if state["plan_Q"].size else None
+        self.plan_index = int(state["plan_index"])
+        self.pi_integral = state["pi_integral"]
+        self.sample_sigma = state["sample_sigma"] if state["sample_sigma"].size else None
+        self.rng.bit_generator.state = json.loads(str(state["rng_state"]))
 
     def compute_h(self, v, T_air, T_amb, L_char=0.04, L_wall=0.4):
-        # Parametry chłodziwa
-        cp, rho, mu, lam, Pr = (self.p.cp_coolant, self.p.rho_coolant,
-                                self.p.mu_coolant, self.p.lambda_coolant,
-                                self.p.Pr_coolant)
-
-        # Ustalanie współczynnika konwekcji
-        if v < 1e-4:
-            # Konwekcja naturalna wg liczby Grashofa
-            g = 9.81
-            beta = 1 / (T_air + 273.15)
-            nu = 1.6e-5
-            delta_T = max(T_air - T_amb, 1e-3)
-
-            Gr = g * beta * delta_T * L_wall ** 3 / nu ** 2
-
-            if Gr < 0:
-                print("Grashof number must be non-negative.")
-                raise ValueError("Grashof number must be non-negative.")
-
-            Nu = 0.59 * (Gr * Pr) ** 0.25
-            h = Nu * 0.026 / L_wall
-        else:
-            # Konwekcja wymuszona wg Churchill-Bernstein
-            Re = rho * v * L_char / mu
-            Nu = 0.3 + (0.62 * Re ** 0.5 * Pr ** (1 / 3)) / (1 + (0.4 / Pr) ** (2 / 3)) ** 0.25
-            Nu *= (1 + (Re / 282000) ** 0.625) ** 0.8
-            h = Nu * lam / L_char
+        # Ustalanie współczynnika konwekcji - v, T_air, T_amb to liczby albo tablice rozgłaszalne
+        if not (isinstance(v, np.ndarray) or isinstance(T_air, np.ndarray) or isinstance(T_amb, np.ndarray)):
+            if v < 1e-4:
+                return self.h_natural(T_air, max(T_air - T_amb, 1e-3), L_wall)
+            return self.h_forced(v, L_char)
+        return np.where(v < 1e-4,
+                        self.h_natural(T_air, np.maximum(T_air - T_amb, 1e-3), L_wall),
+                        self.h_forced(v, L_char))
 
-        return h
+    def h_natural(self, T_air, delta_T, L_wall):
+        # Konwekcja naturalna wg liczby Grashofa
+        g = 9.81
+        beta = 1 / (T_air + 273.15)
+        nu = 1.6e-5
 
-    def predict(self, T, u, Qc, Qg, Qr):
+        Gr = g * beta * delta_T * L_wall ** 3 / nu ** 2
+
+        negative = (Gr < 0).any() if isinstance(Gr, np.ndarray) else Gr < 0
+        if negative:
+            print("Grashof number must be non-negative.")
+            raise ValueError("Grashof number must be non-negative.")
+
+        Nu = 0.59 * (Gr * self.p.Pr_coolant) ** 0.25
+        return Nu * 0.026 / L_wall
+
+    def h_forced(self, v, L_char):
+        # Konwekcja wymuszona wg Churchill-Bernstein
+        rho, mu, lam, Pr = self.p.rho_coolant, self.p.mu_coolant, self.p.lambda_coolant, self.p.Pr_coolant
+        Re = rho * v * L_char / mu
+        Nu = 0.3 + (0.62 * Re ** 0.5 * Pr ** (1 / 3)) / (1 + (0.4 / Pr) ** (2 / 3)) ** 0.25
+        Nu *= (1 + (Re / 282000) ** 0.625) ** 0.8
+        return Nu * lam / L_char
+
+    def derivatives(self, T, u, Qc, Qg, Qr, T_amb):
+        # Pochodne temperatur i ciepło wylotowe; składowe T i u to liczby albo tablice rozgłaszalne
         T_CPU, T_GPU, T_AIR, T_RAM = T
         u_CPU, u_GPU, u_CASE = u
         p = self.p
@@ -45,10 +99,10 @@ class Controller:
         v_GPU = p.v_min_GPU + (p.v_max_GPU - p.v_min_GPU) * (u_GPU / 100)  / p.A_CPU
         v_CASE = p.v_min_case + (p.v_max_case - p.v_min_case) * (u_CASE / 100)  / p.A_CPU
 
-        h_CPU = self.compute_h(v_CPU, T_AIR, p.T_amb, p.L_char_CPU)
-        h_GPU = self.compute_h(v_GPU, T_AIR, p.T_amb, p.L_char_GPU)
-        h_CASE = self.compute_h(v_CASE, T_AIR, p.T_amb, p.L_char_CASE, L_wall=p.L_char_CASE)
-        h_RAM = self.compute_h(0.0, T_AIR, p.T_amb, p.L_char_RAM)
+        h_CPU = self.compute_h(v_CPU, T_AIR, T_amb, p.L_char_CPU)
+        h_GPU = self.compute_h(v_GPU, T_AIR, T_amb, p.L_char_GPU)
+        h_CASE = self.compute_h(v_CASE, T_AIR, T_amb, p.L_char_CASE, L_wall=p.L_char_CASE)
+        h_RAM = self.compute_h(0.0, T_AIR, T_amb, p.L_char_RAM)
 
         # Opór przewodzenia przez radiator
         R_cond_CPU = p.d_CPU / (p.lambda_CPU * p.A_CPU)
@@ -66,7 +120,7 @@ class Controller:
         Q_conv_RAM = h_RAM * p.A_RAM * (T_surf_RAM - T_AIR)
 
         #Konwekcja przez szczeliny obudowy
-        Q_wall = h_CASE * p.A_enclosure * (T_AIR - p.T_amb)
+        Q_wall = h_CASE * p.A_enclosure * (T_AIR - T_amb)
 
         # Radiacja
         if p.enable_radiation:
@@ -74,7 +128,7 @@ class Controller:
             T_GPU_K = T_GPU + 273.15
             T_AIR_K = T_AIR + 273.15
             T_RAM_K = T_RAM + 273.15
-            T_amb_K = p.T_amb + 273.15
+            T_amb_K = T_amb + 273.15
             Q_rad_CPU = p.epsilon_CPU * p.sigma * p.A_CPU * (T_CPU_K ** 4 - T_AIR_K ** 4)
             Q_rad_GPU = p.epsilon_GPU * p.sigma * p.A_GPU * (T_GPU_K ** 4 - T_AIR_K ** 4)
             Q_rad_RAM = p.epsilon_RAM * p.sigma * p.A_RAM * (T_RAM_K ** 4 - T_AIR_K ** 4)
@@ -88,21 +142,136 @@ class Controller:
         dT_RAM = (Qr - Q_conv_RAM - Q_rad_RAM) / p.C_RAM # Pamięć RAM oddaje ciepło jedynie pasywnie
 
         m_dot = p.rho_coolant * v_CASE * p.A_fan_case # Strumień masowy
-        Q_vent = m_dot * p.cp_coolant * (T_AIR - p.T_amb)
+        Q_vent = m_dot * p.cp_coolant * (T_AIR - T_amb)
 
         # Bilans powietrza w obudowie
         dT_AIR = (Q_conv_CPU + Q_conv_GPU + Q_conv_RAM + Q_rad_CPU + Q_rad_GPU + Q_rad_RAM
                   - Q_vent - Q_rad_CASE - Q_wall) / p.C_AIR
 
-        return T + np.array([dT_CPU, dT_GPU, dT_AIR, dT_RAM]) * p.Ts
+        return (dT_CPU, dT_GPU, dT_AIR, dT_RAM), Q_vent
 
-    def step(self, T, u_prev, Qc, Qg, Qr):
+    def predict(self, T, u, Qc, Qg, Qr):
+        dT, _ = self.derivatives(T, u, Qc, Qg, Qr, self.p.T_amb)
+        return T + np.array(dT) * self.p.Ts
+
+    def predict_batch(self, T, u, Qc, Qg, Qr, T_amb=None, return_vent=False):
+        # Wersja wektorowa predict: T [..., 4], u [..., 3], obciążenia i T_amb rozgłaszalne do [...]
+        if T_amb is None:
+            T_amb = self.p.T_amb
+        T = np.asarray(T, dtype=float)
+        u = np.asarray(u, dtype=float)
+        dT, Q_vent = self.derivatives(np.moveaxis(T, -1, 0), np.moveaxis(u, -1, 0), Qc, Qg, Qr, T_amb)
+
+        T_new = T + np.stack(np.broadcast_arrays(*dT), axis=-1) * self.p.Ts
+        if return_vent:
+            return T_new, Q_vent
+        return T_new
+
+    def comfort_temperatures(self):
         p = self.p
-        N = p.N
         T_comfort_CPU = p.T_amb + (p.T_limit_CPU - p.T_amb) * p.n_margin
         T_comfort_GPU = p.T_amb + (p.T_limit_GPU - p.T_amb) * p.n_margin
-        T_comfort_RAM = p.T_amb + (p.T_limit_RAM - p.T_amb) * p.n_margin
         T_comfort_AIR = p.T_amb + (p.T_limit_AIR - p.T_amb) * p.n_margin
+        T_comfort_RAM = p.T_amb + (p.T_limit_RAM - p.T_amb) * p.n_margin
+        return T_comfort_CPU, T_comfort_GPU, T_comfort_AIR, T_comfort_RAM
+
+    def stage_cost(self, T_sim, u_k, prev, T_comfort):
+        # Pojedynczy krok jako jednowierszowa partia - wynik [1]
+        return self.stage_cost_batch(np.reshape(T_sim, (1, 4)), np.reshape(u_k, (1, 3)), prev, T_comfort)
+
+    def stage_cost_batch(self, T_sim, u_k, prev, T_comfort):
+        # Koszt etapu dla [S x 4] stanów i [S x 3] sterowań
+        p = self.p
+
+        thermal_cost = p.w_thermal * (np.maximum(0, T_sim - np.asarray(T_comfort)) ** 2 @ THERMAL_WEIGHTS)
+
+        energy_cost = p.w_energy * np.sum(u_k ** 2, axis=1)
+        noise_cost = p.w_noise * np.sum(
+            self.fan_noise_dB(u_k, np.array([p.L_max_CPU, p.L_max_GPU, p.L_max_case])) ** 2, axis=1)
+        smooth_cost = p.w_smooth * np.sum((u_k - prev) ** 2, axis=1)
+
+        return thermal_cost + energy_cost + noise_cost + smooth_cost
+
+    def rollout_cost(self, T, u_prev, u_seq, Qc, Qg, Qr, T_comfort, T_amb=None):
+        # Koszt S sekwencji sterowań [S x N x 3] w jednym wektorowym przebiegu modelu
+        # T, u_prev, obciążenia i T_amb wspólne albo osobne dla każdego wiersza
+        S, N, _ = u_seq.shape
+        T_sim = np.broadcast_to(T, (S, 4))
+        prev = np.broadcast_to(u_prev, (S, 3))
+        cost_total = np.zeros(S)
+        for k in range(N):
+            T_sim = self.predict_batch(T_sim, u_seq[:, k], Qc, Qg, Qr, T_amb)
+            cost_total += self.stage_cost_batch(T_sim, u_seq[:, k], prev, T_comfort)
+            prev = u_seq[:, k]
+        return cost_total
+
+    def step_sampling(self, T, u_prev, Qc, Qg, Qr):
+        # MPC próbkujące: CEM (elita próbek) albo MPPI (ważenie wykładnicze kosztem)
+        p = self.p
+        N = p.N
+        T_comfort = self.comfort_temperatures()
+        deadline = None if p.deadline is None else time.perf_counter() + p.deadline
+
+        # Rozkład z poprzedniego kroku przesunięty o jeden krok
+        if self.u_plan is not None and self.u_plan.shape == (N, 3):
+            mean = np.vstack((self.u_plan[1:], self.u_plan[-1:]))
+        else:
+            u_ss, _ = self.steady_state(Qc, Qg, Qr)
+            mean = np.tile(u_ss, (N, 1))
+        if self.sample_sigma is not None and self.sample_sigma.shape == (N, 3):
+            sigma = np.maximum(np.vstack((self.sample_sigma[1:], self.sample_sigma[-1:])), p.sampling_sigma_min)
+        else:
+            sigma = np.full((N, 3), p.sampling_sigma)
+
+        self.last_fallback = False
+        self.last_deadline_miss = False
+        iterations = p.cem_iterations if p.solver == "CEM" else 1
+        for it in range(iterations):
+            if deadline is not None and it > 0 and time.perf_counter() > deadline:
+                self.last_deadline_miss = True
+                break
+
+            # Pierwsza próbka to średnia - wynik nie jest gorszy od planu startowego
+            u_seq = mean + sigma * self.rng.standard_normal((p.samples, N, 3))
+            u_seq[0] = mean
+            u_seq = np.clip(u_seq, 0.0, p.U_max)
+            costs = self.rollout_cost(T, u_prev, u_seq, Qc, Qg, Qr, T_comfort)
+
+            if p.solver == "CEM":
+                elites = u_seq[np.argsort(costs)[:max(2, int(p.cem_elite_frac * p.samples))]]
+                mean = elites.mean(axis=0)
+                sigma = np.maximum(elites.std(axis=0), p.sampling_sigma_min)
+                plan = elites[0]
+            else:
+                # Temperatura MPPI względna do rozrzutu kosztów, bo skala kosztu zależy od wag
+                spread = np.median(costs) - costs.min()
+                weights = np.exp(-(costs - costs.min()) / (p.mppi_lambda * spread + 1e-12))
+                weights /= weights.sum()
+                mean = np.einsum("s,snk->nk", weights, u_seq)
+                plan = mean
+
+        if deadline is not None and time.perf_counter() > deadline:
+            self.last_deadline_miss = True
+
+        self.sample_sigma = sigma
+        self.u_plan = np.clip(plan, 0.0, p.U_max)
+        return self.u_plan[0]
+
+    def solve(self, T, u_prev, Qc, Qg, Qr):
+        # Wybór optymalizatora: gradientowy (L-BFGS-B) albo próbkujący (MPPI / CEM)
+        if self.p.solver in ("MPPI", "CEM"):
+            return self.step_sampling(T, u_prev, Qc, Qg, Qr)
+        return self.step(T, u_prev, Qc, Qg, Qr)
+
+    def step(self, T, u_prev, Qc, Qg, Qr):
+        p = self.p
+        N = p.N
+        T_comfort = self.comfort_temperatures()
+
+        # Limit czasu: ostatnia zaakceptowana iteracja L-BFGS-B jest zapamiętywana na wypadek przerwania
+        # (punkty próbne różnic skończonych się nie liczą)
+        deadline = None if p.deadline is None else time.perf_counter() + p.deadline
+        accepted = []
 
         def cost(u_flat):
             u_seq = u_flat.reshape((N, 3))
@@ -113,32 +282,173 @@ class Controller:
                 u_k = u_seq[k]
                 T_sim = self.predict(T_sim, u_k, Qc, Qg, Qr)
 
-                thermal_cost = (
-                        p.w_thermal * max(0, T_sim[0] - T_comfort_CPU) ** 2 +
-                        p.w_thermal * max(0, T_sim[1] - T_comfort_GPU) ** 2 +
-                        0.5 * p.w_thermal * max(0, T_sim[2] - T_comfort_AIR) ** 2 +
-                        0.3 * p.w_thermal * max(0, T_sim[3] - T_comfort_RAM) ** 2
-                )
-
                 prev = u_prev if k == 0 else u_seq[k - 1]
-                energy_cost = p.w_energy * np.sum(u_k ** 2)
-                noise_cost = p.w_noise * (
-                        self.fan_noise_dB([u_k[0]], p.L_max_CPU) ** 2 +
-                        self.fan_noise_dB([u_k[1]], p.L_max_GPU) ** 2 +
-                        self.fan_noise_dB([u_k[2]], p.L_max_case) ** 2
-                )
-                smooth_cost = p.w_smooth * np.sum((u_k - prev) ** 2)
+                cost_total += self.stage_cost(T_sim, u_k, prev, T_comfort)
 
-                cost_total += thermal_cost + energy_cost + noise_cost + smooth_cost
+            if deadline is not None and time.perf_counter() > deadline:
+                raise DeadlineExceeded()
 
             return cost_total
 
-        u0 = np.tile(u_prev, (N, 1)).flatten()
-        result = minimize(cost, u0, method='L-BFGS-B',
-                       bounds=[(0, p.U_max)] * (N * 3),
-                       options={'maxiter': 50, 'ftol': 1e-5})
+        # Ciepły start: plan z poprzedniego kroku przesunięty o jeden krok
+        # Bez planu startujemy z optymalnego punktu pracy w stanie ustalonym
+        if self.u_plan is not None and self.u_plan.shape == (N, 3):
+            u0 = np.vstack((self.u_plan[1:], self.u_plan[-1:])).flatten()
+        else:
+            u_ss, _ = self.steady_state(Qc, Qg, Qr)
+            u0 = np.tile(u_ss, (N, 1)).flatten()
+        self.last_fallback = False
+        self.last_deadline_miss = False
+        try:
+            # Wyznaczenie punktu pracy nie ma ograniczonego czasu - limit sprawdzany przed optymalizacją
+            if deadline is not None and time.perf_counter() > deadline:
+                raise DeadlineExceeded()
+            result = minimize(cost, u0, method='L-BFGS-B',
+                           bounds=[(0, p.U_max)] * (N * 3),
+                           options={'maxiter': 50, 'ftol': 1e-5},
+                           callback=lambda xk: accepted.append(xk.copy()))
+            x = result.x
+        except DeadlineExceeded:
+            # Bez zaakceptowanej iteracji najlepszy dostępny jest plan startowy
+            # (przesunięty poprzedni plan albo punkt pracy w stanie ustalonym)
+            self.last_deadline_miss = True
+            x = accepted[-1] if accepted else u0
+
+        # Wynik nieskończony - regulator PI, plan startowy zostaje do kolejnego kroku
+        if x is None or not np.all(np.isfinite(x)):
+            self.last_fallback = True
+            self.u_plan = u0.reshape((N, 3))
+            return self.fallback(T)
+
+        self.u_plan = x.reshape((N, 3))
+        return self.u_plan[0]
+
+    def step_batch(self, T, u_prev, Q, T_amb, u_plan=None):
+        # MPC dla K obudów [K x ...] jako jedno zadanie L-BFGS-B; T_amb [K] to temperatury wlotu,
+        # temperatury komfortu liczone od otoczenia p.T_amb. Zwraca plany [K x N x 3]
+        p = self.p
+        N = p.N
+        K = len(T)
+        n = N * 3
+        eps = 1e-8
+        T_comfort = self.comfort_temperatures()
+
+        # Koszt jest sumą kosztów obudów, więc przesunięcie współrzędnej j we wszystkich obudowach naraz
+        # daje gradient każdej z nich - punkt i n przesunięć liczone w jednym przebiegu K * (n + 1) wierszy
+        T_rows = np.repeat(T, n + 1, axis=0)
+        prev_rows = np.repeat(u_prev, n + 1, axis=0)
+        Q_rows = np.repeat(Q, n + 1, axis=0)
+        T_amb_rows = np.repeat(np.broadcast_to(T_amb, K), n + 1)
+
+        def cost(u_flat):
+            x = u_flat.reshape((K, 1, n))
+            h = np.where(x + eps > p.U_max, -eps, eps)  # krok wstecz przy górnym ograniczeniu
+            probes = np.repeat(x, n + 1, axis=1)
+            probes[:, 1:] += np.eye(n) * h
+            costs = self.rollout_cost(T_rows, prev_rows, probes.reshape((-1, N, 3)),
+                                      Q_rows[:, 0], Q_rows[:, 1], Q_rows[:, 2], T_comfort,
+                                      T_amb_rows).reshape((K, n + 1))
+            grad = (costs[:, 1:] - costs[:, :1]) / h[:, 0]
+            return costs[:, 0].sum(), grad.ravel()
+
+        # Ciepły start: przesunięte plany albo punkt pracy w stanie ustalonym (wspólny dla równych obciążeń)
+        if u_plan is not None and u_plan.shape == (K, N, 3):
+            u0 = np.concatenate((u_plan[:, 1:], u_plan[:, -1:]), axis=1)
+        else:
+            u_ss = {}
+            for Q_i in map(tuple, Q):
+                if Q_i not in u_ss:
+                    u_ss[Q_i] = self.steady_state(*Q_i)[0]
+            u0 = np.stack([np.tile(u_ss[Q_i], (N, 1)) for Q_i in map(tuple, Q)])
+
+        result = minimize(cost, u0.ravel(), jac=True, method='L-BFGS-B',
+                          bounds=[(0, p.U_max)] * (K * n),
+                          options={'maxiter': 50, 'ftol': 1e-5})
+        return result.x.reshape((K, N, 3))
+
+    def fallback(self, T):
+        # Tania krzywa wentylatorów PI: CPU i GPU wg własnej temperatury, obudowa wg powietrza i RAM
+        p = self.p
+        e = np.asarray(T) - np.array(self.comfort_temperatures())
+        e_fan = np.array([e[0], e[1], max(e[2], e[3])])
+        self.pi_integral = np.clip(self.pi_integral + e_fan * p.Ts, 0.0, p.U_max / p.fallback_Ki)
+        return np.clip(p.fallback_Kp * e_fan + p.fallback_Ki * self.pi_integral, 0.0, p.U_max)
+
+    def step_event(self, T, u_prev, Qc, Qg, Qr):
+        # Wykonanie zapamiętanego planu; ponowna optymalizacja tylko gdy stan odbiega od przewidywanego,
+        # zmienia się obciążenie albo plan się kończy
+        p = self.p
+        Q = np.array([Qc, Qg, Qr])
+        j = self.plan_index
+
+        trigger = (self.u_plan is None or self.T_pred is None or j >= len(self.u_plan)
+                   or np.max(np.abs(Q - self.plan_Q)) > p.event_Q_tol
+                   or (j > 0 and np.max(np.abs(T - self.T_pred[j - 1])) > p.event_T_tol))
+
+        if trigger:
+            # step przesuwa plan o jeden krok - wcześniej przesuwamy o pozostałe wykonane kroki
+            if self.u_plan is not None and j > 1:
+                self.u_plan = np.vstack((self.u_plan[j - 1:], np.repeat(self.u_plan[-1:], j - 1, axis=0)))
+            u = self.solve(T, u_prev, Qc, Qg, Qr)
+            if self.last_fallback:
+                # Plan nie został wyznaczony - w kolejnym kroku ponowna optymalizacja
+                self.T_pred = None
+                self.plan_index = 0
+                self.plan_Q = Q
+                self.last_solved = True
+                return u
+
+            T_sim = T
+            self.T_pred = np.empty((len(self.u_plan), 4))
+            for k, u_k in enumerate(self.u_plan):
+                T_sim = self.predict(T_sim, u_k, Qc, Qg, Qr)
+                self.T_pred[k] = T_sim
+            self.plan_Q = Q
+            j = 0
+
+        self.plan_index = j + 1
+        self.last_solved = trigger
+        return self.u_plan[j]
+
+    def control(self, T, u_prev, Qc, Qg, Qr):
+        # Wybór strategii MPC wg parametrów, z pomiarem czasu obliczeń
+        start = time.perf_counter()
+        self.last_fallback = False
+        self.last_deadline_miss = False
+        if self.p.event_triggered:
+            u = self.step_event(T, u_prev, Qc, Qg, Qr)
+        else:
+            self.last_solved = True
+            u = self.solve(T, u_prev, Qc, Qg, Qr)
+        self.last_latency = time.perf_counter() - start
+        return u
+
+    def equilibrium(self, u, Qc, Qg, Qr, T0=None):
+        # Temperatury ustalone przy stałym sterowaniu i obciążeniu: dT = 0
+        p = self.p
+        if T0 is None:
+            T0 = np.full(4, p.T_amb + 10.0)
+        result = root(lambda T: (self.predict(T, u, Qc, Qg, Qr) - T) / p.Ts, T0, method='hybr',
+                      options={'xtol': 1e-12})
+        return result.x
+
+    def steady_state(self, Qc, Qg, Qr):
+        # Optymalny ustalony punkt pracy wg tych samych wag co w step (bez kosztu płynności)
+        p = self.p
+        T_comfort = self.comfort_temperatures()
+        T_guess = [None]
+
+        def cost(u):
+            T_ss = self.equilibrium(u, Qc, Qg, Qr, T_guess[0])
+            T_guess[0] = T_ss
+            return self.stage_cost(T_ss, u, u, T_comfort)
+
+        result = minimize(cost, np.full(3, p.U_max / 2), method='L-BFGS-B',
+                          bounds=[(0, p.U_max)] * 3,
+                          options={'maxiter': 50, 'ftol': 1e-9, 'eps': 1e-4})
 
-        return result.x.reshape((N, 3))[0]
+        u = result.x
+        return u, self.equilibrium(u, Qc, Qg, Qr, T_guess[0])
 
     @staticmethod
     def fan_noise_dB(u_list, L_max, L_base=20.0):
@@ -1,12 +1,17 @@
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
 import numpy as np
 import plotly.express as px
 import diskcache
 from dash import Dash, html, dcc, callback, Output, Input, State, DiskcacheManager
 import dash_bootstrap_components as dbc
 
-from parameters import Parameters
-from controller import Controller
-from load_profile import cpu_load, gpu_load, ram_load
+from parameters import Parameters, operation_modes
+from load_profile import available_modes, is_trace_mode, load_trace
+from simulation import run_dir_for, run_simulation, load_history, noise_dB, fan_power, summarize
+from steady_state import solve_operating_point
 
 cache = diskcache.Cache("./cache")
 background_callback_manager = DiskcacheManager(cache)
@@ -58,6 +63,68 @@ def make_graph(x, ys, title, labels, hline=None):
     )
     return fig
 
+def build_parameters(coolant, op_mode, mat_cpu, mat_gpu, mat_ram, T_amb, N_horizon,
+                     T_limit_CPU, T_limit_GPU, T_limit_RAM, T_limit_AIR, advanced_options):
+    # Inicjalizacja parametrów
+    p = Parameters()
+    p.T_limit_CPU = T_limit_CPU
+    p.T_limit_GPU = T_limit_GPU
+    p.T_limit_RAM = T_limit_RAM
+    p.T_limit_AIR = T_limit_AIR
+    p.T_amb = T_amb
+    p.N = N_horizon
+
+    # Radiacja
+    p.enable_radiation = "radiation" in (advanced_options or [])
+
+    # MPC wyzwalane zdarzeniami
+    p.event_triggered = "event" in (advanced_options or [])
+
+    # Aktualizacja materiałów radiatorów
+    p.update_heatsink_material(mat_cpu, mat_gpu, mat_ram)
+
+    # Aktualizacja cieczy chłodzącej
+    p.update_coolant(coolant)
+
+    # Aktualizacja wag MPC
+    p.set_operation_mode(op_mode)
+    return p
+
+@callback(
+    Output("steady-state-output", "children"),
+    Input("steady-state-button", "n_clicks"),
+    State("mode", "value"),
+    State("coolant", "value"),
+    State("op_mode", "value"),
+    State("mat_cpu", "value"),
+    State("mat_gpu", "value"),
+    State("mat_ram", "value"),
+    State("T_amb", "value"),
+    State("N_horizon", "value"),
+    State("T_limit_CPU", "value"),
+    State("T_limit_GPU", "value"),
+    State("T_limit_RAM", "value"),
+    State("T_limit_AIR", "value"),
+    State("advanced_options", "value"),
+    State("trace_start", "value"),
+    State("trace_end", "value"),
+    prevent_initial_call=True
+)
+def update_steady_state(n_clicks, mode, coolant, op_mode, mat_cpu, mat_gpu, mat_ram,
+                        T_amb, N_horizon, T_limit_CPU, T_limit_GPU, T_limit_RAM, T_limit_AIR, advanced_options,
+                        trace_start, trace_end):
+    p = build_parameters(coolant, op_mode, mat_cpu, mat_gpu, mat_ram, T_amb, N_horizon,
+                         T_limit_CPU, T_limit_GPU, T_limit_RAM, T_limit_AIR, advanced_options)
+    if is_trace_mode(mode):
+        load_trace(mode, p.Ts, trace_start, trace_end)
+
+    result = solve_operating_point(p, mode)
+    u, T = result["u"], result["T"]
+    return [
+        html.P(f"PWM [%]: CPU {u[0]:.1f} | GPU {u[1]:.1f} | obudowa {u[2]:.1f}"),
+        html.P(f"Temperatury [°C]: CPU {T[0]:.1f} | GPU {T[1]:.1f} | powietrze {T[2]:.1f} | RAM {T[3]:.1f}"),
+    ]
+
 @callback(
     Output("graph-temp", "figure"),
     Output("graph-pwm", "figure"),
@@ -79,6 +146,11 @@ def make_graph(x, ys, title, labels, hline=None):
     State("T_limit_RAM", "value"),
     State("T_limit_AIR", "value"),
     State("advanced_options", "value"),
+    State("trace_start", "value"),
+    State("trace_end", "value"),
+    State("simulation_steps", "value"),
+    State("deadline_ms", "value"),
+    State("solver", "value"),
     background=True,
     manager=background_callback_manager,
     progress=[
@@ -93,134 +165,129 @@ def make_graph(x, ys, title, labels, hline=None):
 )
 
 def update_output(set_progress, n_clicks, mode, coolant, op_mode, mat_cpu, mat_gpu, mat_ram,
-                  T_amb, N_horizon, T_limit_CPU, T_limit_GPU, T_limit_RAM, T_limit_AIR, advanced_options):
-    # Inicjalizacja parametrów
-    p = Parameters()
-    p.T_limit_CPU = T_limit_CPU
-    p.T_limit_GPU = T_limit_GPU
-    p.T_limit_RAM = T_limit_RAM
-    p.T_limit_AIR = T_limit_AIR
-    p.T_amb = T_amb
-    p.N = N_horizon
-
-    # Radiacja
-    p.enable_radiation = "radiation" in (advanced_options or [])
-
-    # Aktualizacja materiałów radiatorów
-    p.update_heatsink_material(mat_cpu, mat_gpu, mat_ram)
-
-    # Aktualizacja cieczy chłodzącej
-    p.update_coolant(coolant)
-
-    # Aktualizacja wag MPC
-    p.set_operation_mode(op_mode)
-
-    # Inicjalizacja kontrolera
-    controller = Controller(p)
-
-    # Stan początkowy
-    T = np.array([T_amb, T_amb, T_amb, T_amb])
-    u_prev = np.array([0.0, 0.0, 0.0])
-
-    # Tablice do zapisu wyników
-    time = [0.0]
-    T_CPU_hist = [T[0]]
-    T_GPU_hist = [T[1]]
-    T_AIR_hist = [T[2]]
-    T_RAM_hist = [T[3]]
-
-    U_CPU_hist = [0.0]
-    U_GPU_hist = [0.0]
-    U_CASE_hist = [0.0]
-
-    Q_load_CPU_hist = []
-    Q_load_GPU_hist = []
-    Q_load_RAM_hist = []
+                  T_amb, N_horizon, T_limit_CPU, T_limit_GPU, T_limit_RAM, T_limit_AIR, advanced_options,
+                  trace_start, trace_end, simulation_steps, deadline_ms, solver):
+    p, run_dir, total_steps = prepare_run(mode, coolant, op_mode, mat_cpu, mat_gpu, mat_ram,
+                                          T_amb, N_horizon, T_limit_CPU, T_limit_GPU, T_limit_RAM, T_limit_AIR,
+                                          advanced_options, trace_start, trace_end, simulation_steps,
+                                          deadline_ms, solver)
+
+    def progress(percent, k, total):
+        set_progress((percent, f"Trwa symulacja: {percent}% ({k}/{total})"))
+
+    run_simulation(p, mode, run_dir, total_steps, progress)
+
+    title_suffix = f" ({mode} | {coolant} | {op_mode} | {solver})"
+    summary = summarize(p, run_dir)
+    if p.event_triggered:
+        title_suffix += f" | optymalizacja w {summary['trigger_rate'] * 100:.0f}% kroków"
+    if p.deadline is not None:
+        title_suffix += (f" | przekroczenia limitu: {summary['deadline_misses']}, PI: {summary['fallbacks']},"
+                         f" maks. {summary['latency_max'] * 1000:.0f} ms")
+
+    return build_figures(p, [("", load_history(run_dir))], title_suffix)
+
+def prepare_run(mode, coolant, op_mode, mat_cpu, mat_gpu, mat_ram,
+                T_amb, N_horizon, T_limit_CPU, T_limit_GPU, T_limit_RAM, T_limit_AIR, advanced_options,
+                trace_start, trace_end, simulation_steps, deadline_ms, solver):
+    p = build_parameters(coolant, op_mode, mat_cpu, mat_gpu, mat_ram, T_amb, N_horizon,
+                         T_limit_CPU, T_limit_GPU, T_limit_RAM, T_limit_AIR, advanced_options)
+    if simulation_steps:
+        p.simulation_steps = int(simulation_steps)
+    p.deadline = deadline_ms / 1000 if deadline_ms else None
+    p.solver = solver
 
     total_steps = p.simulation_steps
-    for k in range(total_steps+1):
-        percent = int((k / total_steps) * 100)
-        set_progress((percent, f"Trwa symulacja: {percent}% ({k}/{total_steps})"))
-
-        # Obciążenie cieplne
-        Qc = cpu_load(k, mode)
-        Qg = gpu_load(k, mode)
-        Qr = ram_load(k, mode)
-
-        # MPC - obliczenie optymalnego sterowania
-        u = controller.step(T, u_prev, Qc, Qg, Qr)
-        u = np.clip(u, 0.0, p.U_max)
-
-        # Predykcja nowego stanu
-        T = controller.predict(T, u, Qc, Qg, Qr)
-
-        # Zapis
-        time.append(time[-1] + p.Ts)
-        T_CPU_hist.append(T[0])
-        T_GPU_hist.append(T[1])
-        T_AIR_hist.append(T[2])
-        T_RAM_hist.append(T[3])
-
-        U_CPU_hist.append(u[0])
-        U_GPU_hist.append(u[1])
-        U_CASE_hist.append(u[2])
-
-        Q_load_CPU_hist.append(Qc)
-        Q_load_GPU_hist.append(Qg)
-        Q_load_RAM_hist.append(Qr)
-
-        u_prev = u
-
-    # Uchyb regulacji
-    CPU_error = [T_limit_CPU - t for t in T_CPU_hist]
-    GPU_error = [T_limit_GPU - t for t in T_GPU_hist]
-    RAM_error = [p.T_limit_RAM - t for t in T_RAM_hist]
-    AIR_error = [T_limit_AIR - t for t in T_AIR_hist]
-
-    # Hałas [dB]
-    CPU_dB = controller.fan_noise_dB(U_CPU_hist, p.L_max_CPU)
-    GPU_dB = controller.fan_noise_dB(U_GPU_hist, p.L_max_GPU)
-    CASE_dB = controller.fan_noise_dB(U_CASE_hist, p.L_max_case)
-
-    # Całkowity hałas
-    total_dB = 10 * np.log10(10 ** (CPU_dB / 10) + 10 ** (GPU_dB / 10) + 10 ** (CASE_dB / 10))
-
-    # Przybliżona moc wentylatorów (W)
-    P_max_CPU = 5.0
-    P_max_GPU = 7.0
-    P_max_CASE = 5.0
-
-    P_CPU_hist = [(u / 100) ** 3 * P_max_CPU for u in U_CPU_hist]
-    P_GPU_hist = [(u / 100) ** 3 * P_max_GPU for u in U_GPU_hist]
-    P_CASE_hist = [(u / 100) ** 3 * P_max_CASE for u in U_CASE_hist]
-
-    title_suffix = f" ({mode} | {coolant} | {op_mode})"
+    trace_grid = None
+
+    # Profil z telemetrii - przepróbkowany na siatkę Ts w wybranym oknie czasu
+    if is_trace_mode(mode):
+        trace = load_trace(mode, p.Ts, trace_start, trace_end)
+        total_steps = len(trace) - 1
+        trace_grid = trace.grid.filename
+
+    # Przebieg dzielony na fragmenty zapisywane na dysk; ta sama konfiguracja wznawia przerwany przebieg.
+    # Klucz z efektywnych parametrów - ponownie zapisany tryb pracy z innymi wagami to nowy przebieg
+    run_dir = run_dir_for({"params": vars(p), "mode": mode, "steps": total_steps, "trace": trace_grid})
+    return p, run_dir, total_steps
+
+def build_figures(p, scenarios, title_suffix):
+    # scenarios: lista (etykieta, historia); przy kilku scenariuszach serie są nakładane na te same wykresy
+    def name(label, series):
+        return f"{label} - {series}" if label else series
+
+    T_ys, U_ys, E_ys, S_ys, FP_ys, P_ys = {}, {}, {}, {}, {}, {}
+    for label, hist in scenarios:
+        # Historia do wykresów (zdecymowana) ze stanem początkowym na początku
+        time = np.concatenate(([0.0], hist["t"]))
+        T_CPU_hist, T_GPU_hist, T_AIR_hist, T_RAM_hist = np.vstack((np.full(4, p.T_amb), hist["T"])).T
+        U_hist = np.vstack((np.zeros(3), hist["U"]))
+        U_CPU_hist, U_GPU_hist, U_CASE_hist = U_hist.T
+        Q_load_CPU_hist, Q_load_GPU_hist, Q_load_RAM_hist = hist["Q"].T
+
+        # Uchyb regulacji
+        CPU_error = p.T_limit_CPU - T_CPU_hist
+        GPU_error = p.T_limit_GPU - T_GPU_hist
+        RAM_error = p.T_limit_RAM - T_RAM_hist
+        AIR_error = p.T_limit_AIR - T_AIR_hist
+
+        # Hałas [dB] i hałas całkowity
+        CPU_dB, GPU_dB, CASE_dB, total_dB = noise_dB(p, U_hist).T
+
+        # Przybliżona moc wentylatorów (W)
+        P_CPU_hist, P_GPU_hist, P_CASE_hist = fan_power(U_hist).T
+
+        T_ys.update({
+            name(label, "Procesor"): T_CPU_hist,
+            name(label, "Karta graficzna"): T_GPU_hist,
+            name(label, "Pamięć RAM"): T_RAM_hist,
+            name(label, "Wnętrze obudowy"): T_AIR_hist
+        })
+        U_ys.update({
+            name(label, "Wentylator procesora"): U_CPU_hist,
+            name(label, "Wentylator karty graficznej"): U_GPU_hist,
+            name(label, "Wentylator obdudowy"): U_CASE_hist
+        })
+        E_ys.update({
+            name(label, "Procesor"): CPU_error,
+            name(label, "Karta graficzna"): GPU_error,
+            name(label, "Pamięć RAM"): RAM_error,
+            name(label, "Wnętrze obudowy"): AIR_error
+        })
+        S_ys.update({
+            name(label, "Wentyltaor procesora"): CPU_dB,
+            name(label, "Wentylator karty graficznej"): GPU_dB,
+            name(label, "Wentylator obudowy"): CASE_dB,
+            name(label, "Całkowity"): total_dB
+        })
+        FP_ys.update({
+            name(label, "Wentylator CPU"): P_CPU_hist,
+            name(label, "Wentylator GPU"): P_GPU_hist,
+            name(label, "Wentylator obudowy"): P_CASE_hist,
+            name(label, "Łącznie"): P_CPU_hist + P_GPU_hist + P_CASE_hist
+        })
+        P_ys.update({
+            name(label, "Obciążenie procesora"): Q_load_CPU_hist,
+            name(label, "Obciążenie karty graficznej"): Q_load_GPU_hist,
+            name(label, "Obciążenie pamięci RAM"): Q_load_RAM_hist,
+        })
 
     fig_T = make_graph(
         time,
-        {
-            "Procesor": T_CPU_hist,
-            "Karta graficzna": T_GPU_hist,
-            "Pamięć RAM": T_RAM_hist,
-            "Wnętrze obudowy": T_AIR_hist
-        },
+        T_ys,
         f"Temperatury systemu" + title_suffix,
         {"x": "Czas [s]", "y": "Temperatura [°C]"},
         hline=[
-            (T_limit_CPU, "red", "temperatury CPU"),
-            (T_limit_GPU, "blue", "temperatury GPU"),
-            (T_limit_RAM, "orange", "temperatury RAM"),
-            (T_limit_AIR, "green", "temperatury w obudowie"),
+            (p.T_limit_CPU, "red", "temperatury CPU"),
+            (p.T_limit_GPU, "blue", "temperatury GPU"),
+            (p.T_limit_RAM, "orange", "temperatury RAM"),
+            (p.T_limit_AIR, "green", "temperatury w obudowie"),
         ]
     )
 
     fig_U = make_graph(
         time,
-        {
-            "Wentylator procesora": U_CPU_hist,
-            "Wentylator karty graficznej": U_GPU_hist,
-            "Wentylator obdudowy": U_CASE_hist
-        },
+        U_ys,
         f"Sterowanie PWM" + title_suffix,
         {"x": "Czas [s]", "y": "PWM [%]"},
         hline=[(100, "red", "")]
@@ -228,36 +295,21 @@ def update_output(set_progress, n_clicks, mode, coolant, op_mode, mat_cpu, mat_g
 
     fig_E = make_graph(
         time,
-        {
-            "Procesor": CPU_error,
-            "Karta graficzna": GPU_error,
-            "Pamięć RAM": RAM_error,
-            "Wnętrze obudowy": AIR_error
-        },
+        E_ys,
         f"Uchyb regulacji (zapas do limitu)" + title_suffix,
         {"x": "Czas [s]", "y": "Zapas [°C]"}
     )
 
     fig_S = make_graph(
         time,
-        {
-            "Wentyltaor procesora": CPU_dB,
-            "Wentylator karty graficznej": GPU_dB,
-            "Wentylator obudowy": CASE_dB,
-            "Całkowity": total_dB
-        },
+        S_ys,
         f"Hałas wentylatorów" + title_suffix,
         {"x": "Czas [s]", "y": "Poziom dźwięku [dB]"}
     )
 
     fig_FP = make_graph(
         time,
-        {
-            "Wentylator CPU": P_CPU_hist,
-            "Wentylator GPU": P_GPU_hist,
-            "Wentylator obudowy": P_CASE_hist,
-            "Łącznie": [cpu + gpu + case for cpu, gpu, case in zip(P_CPU_hist, P_GPU_hist, P_CASE_hist)]
-        },
+        FP_ys,
         f"Zużycie energii przez wentylatory" + title_suffix,
         {"x": "Czas [s]", "y": "Moc [W]"}
     )
@@ -265,17 +317,116 @@ def update_output(set_progress, n_clicks, mode, coolant, op_mode, mat_cpu, mat_g
     time_power = time[1:]  # Przesunięcie czasu (bo Q_load ma len-1)
     fig_P = make_graph(
         time_power,
-        {
-            "Obciążenie procesora": Q_load_CPU_hist,
-            "Obciążenie karty graficznej": Q_load_GPU_hist,
-            "Obciążenie pamięci RAM": Q_load_RAM_hist,
-        },
+        P_ys,
         f"Obciążenie cieplne" + title_suffix,
         {"x": "Czas [s]", "y": "Moc [W]"}
     )
 
     return fig_T, fig_U, fig_E, fig_S, fig_FP, fig_P
 
+GRAPH_IDS = ["graph-temp", "graph-pwm", "graph-error", "graph-sound", "graph-fan-power", "graph-power"]
+
+def run_scenario(settings):
+    # Pojedynczy scenariusz porównania - uruchamiany w osobnym procesie
+    p, run_dir, total_steps = prepare_run(**settings)
+    run_simulation(p, settings["mode"], run_dir, total_steps)
+    return load_history(run_dir), summarize(p, run_dir)
+
+def kpi_table(rows):
+    header = ["Scenariusz", "T maks. CPU [°C]", "T maks. GPU [°C]", "T maks. RAM [°C]",
+              "T maks. powietrza [°C]", "Energia wentylatorów [J]", "Średni hałas [dB]", "Maks. hałas [dB]"]
+    body = []
+    for label, s in rows:
+        T_CPU, T_GPU, T_AIR, T_RAM = s["T_max"]
+        values = [T_CPU, T_GPU, T_RAM, T_AIR, s["fan_energy"].sum(), s["mean_dB"], s["max_dB"]]
+        body.append(html.Tr([html.Td(label)] + [html.Td(f"{v:.1f}") for v in values]))
+    return dbc.Table([html.Thead(html.Tr([html.Th(h) for h in header])), html.Tbody(body)],
+                     bordered=True, striped=True, size="sm")
+
+@callback(
+    Output("kpi-table", "children"),
+    Input("compare-button", "n_clicks"),
+    State("mode", "value"),
+    State("coolant", "value"),
+    State("op_mode", "value"),
+    State("mat_cpu", "value"),
+    State("mat_gpu", "value"),
+    State("mat_ram", "value"),
+    State("T_amb", "value"),
+    State("N_horizon", "value"),
+    State("T_limit_CPU", "value"),
+    State("T_limit_GPU", "value"),
+    State("T_limit_RAM", "value"),
+    State("T_limit_AIR", "value"),
+    State("advanced_options", "value"),
+    State("trace_start", "value"),
+    State("trace_end", "value"),
+    State("simulation_steps", "value"),
+    State("deadline_ms", "value"),
+    State("solver", "value"),
+    State("cmp_op_modes", "value"),
+    State("cmp_coolants", "value"),
+    State("cmp_materials", "value"),
+    background=True,
+    manager=background_callback_manager,
+    # Wykresy i tabela jako wyjścia postępu - każde wywołanie set_progress przesyła komplet wartości
+    progress=[Output(graph_id, "figure") for graph_id in GRAPH_IDS] + [
+        Output("kpi-table", "children"),
+        Output("compare-progress-text", "children"),
+    ],
+    running=[
+        (Output("compare-button", "disabled"), True, False),
+    ],
+    prevent_initial_call=True
+)
+
+def update_comparison(set_progress, n_clicks, mode, coolant, op_mode, mat_cpu, mat_gpu, mat_ram,
+                      T_amb, N_horizon, T_limit_CPU, T_limit_GPU, T_limit_RAM, T_limit_AIR, advanced_options,
+                      trace_start, trace_end, simulation_steps, deadline_ms, solver,
+                      cmp_op_modes, cmp_coolants, cmp_materials):
+    base = dict(mode=mode, coolant=coolant, op_mode=op_mode, mat_cpu=mat_cpu, mat_gpu=mat_gpu, mat_ram=mat_ram,
+                T_amb=T_amb, N_horizon=N_horizon, T_limit_CPU=T_limit_CPU, T_limit_GPU=T_limit_GPU,
+                T_limit_RAM=T_limit_RAM, T_limit_AIR=T_limit_AIR, advanced_options=advanced_options,
+                trace_start=trace_start, trace_end=trace_end, simulation_steps=simulation_steps,
+                deadline_ms=deadline_ms, solver=solver)
+
+    # Iloczyn kartezjański wybranych wariantów; niewybrany wymiar bierze wartość z panelu parametrów
+    op_modes = cmp_op_modes or [op_mode]
+    coolants = cmp_coolants or [coolant]
+    materials = cmp_materials or [None]
+    scenarios = []
+    for o, c, m in itertools.product(op_modes, coolants, materials):
+        settings = dict(base, op_mode=o, coolant=c)
+        if m is not None:
+            settings.update(mat_cpu=m, mat_gpu=m)
+        parts = [v for v, variants in ((o, op_modes), (c, coolants), (m, materials)) if len(variants) > 1]
+        scenarios.append((" | ".join(parts) or o, settings))
+
+    p = build_parameters(coolant, op_mode, mat_cpu, mat_gpu, mat_ram, T_amb, N_horizon,
+                         T_limit_CPU, T_limit_GPU, T_limit_RAM, T_limit_AIR, advanced_options)
+    title_suffix = f" (porównanie | {mode})"
+    order = [label for label, _ in scenarios]
+
+    # Siatka śladu budowana raz, zanim procesy scenariuszy zaczną z niej czytać
+    if is_trace_mode(mode):
+        load_trace(mode, p.Ts, trace_start, trace_end)
+    done = []
+
+    # Każdy scenariusz w osobnym procesie; wyniki rysowane zaraz po ukończeniu
+    set_progress([{}] * len(GRAPH_IDS) + [None, f"Trwa porównanie: 0/{len(scenarios)} scenariuszy"])
+    with ProcessPoolExecutor(max_workers=min(len(scenarios), os.cpu_count() or 1)) as executor:
+        futures = {executor.submit(run_scenario, settings): label for label, settings in scenarios}
+        for future in as_completed(futures):
+            hist, summary = future.result()
+            done.append((futures[future], hist, summary))
+            done.sort(key=lambda d: order.index(d[0]))
+
+            figures = build_figures(p, [(label, hist) for label, hist, _ in done], title_suffix)
+            set_progress(list(figures) + [kpi_table([(label, s) for label, _, s in done]),
+                                          f"Trwa porównanie: {len(done)}/{len(scenarios)} scenariuszy"])
+
+    return kpi_table([(label, s) for label, _, s in done])
+
 def main():
     app = Dash(
         __name__,
@@ -292,12 +443,18 @@ def main():
             html.Label("Tryb obciążenia"),
             dcc.Dropdown(
                 id="mode",
-                options=["Bezczynny", "Standard", "Stres", "Stres2", "Stres3", "GRA1", "GRA2", "GRA3"],
+                options=available_modes(),
                 value="Stres",
                 clearable=False,
                 className="parameters-dropdown",
             ),
 
+            html.Label("Okno czasu śladu [s] (od - do)"),
+            html.Div(children=[
+                dcc.Input(id="trace_start", type="number", min=0, value=0, debounce=True),
+                dcc.Input(id="trace_end", type="number", min=0, value=2000, debounce=True),
+            ]),
+
             html.Br(),
 
             html.Label("Medium chłodzące"),
@@ -314,7 +471,7 @@ def main():
             html.Label("Tryb pracy"),
             dcc.Dropdown(
                 id="op_mode",
-                options=["Cicha praca", "Standard", "Wysoka wydajność"],
+                options=operation_modes(),
                 value="Standard",
                 clearable=False,
                 className="parameters-dropdown",
@@ -357,6 +514,24 @@ def main():
             dcc.Slider(15, 40, 1, value=22, id="T_amb",
                        marks={i: str(i) for i in range(15, 41, 5)}),
 
+            html.Br(),
+            html.Label("Liczba kroków symulacji"),
+            dcc.Input(id="simulation_steps", type="number", min=1, step=1, value=2000, debounce=True),
+
+            html.Br(),
+            html.Label("Optymalizator MPC"),
+            dcc.Dropdown(
+                id="solver",
+                options=["L-BFGS-B", "MPPI", "CEM"],
+                value="L-BFGS-B",
+                clearable=False,
+                className="parameters-dropdown",
+            ),
+
+            html.Br(),
+            html.Label("Limit czasu MPC [ms] (0 - bez limitu)"),
+            dcc.Input(id="deadline_ms", type="number", min=0, step=1, value=0, debounce=True),
+
             html.Br(),
             html.Label("Horyzont MPC (N)"),
             dcc.Slider(2, 20, 1, value=8, id="N_horizon",
@@ -388,7 +563,9 @@ def main():
                 id="advanced_options",
                 options=[
                     {"label": " Uwzględnij radiację (promieniowanie cieplne)",
-                     "value": "radiation"}
+                     "value": "radiation"},
+                    {"label": " MPC wyzwalane zdarzeniami",
+                     "value": "event"}
                 ],
                 value=["radiation"],
                 style={"fontSize": "14px"}
@@ -397,6 +574,39 @@ def main():
             html.Br(),
             html.Button("Symuluj", id="button", n_clicks=0,
                         style={"fontSize": "16px", "padding": "10px 20px"}),
+            html.Button("Stan ustalony", id="steady-state-button", n_clicks=0,
+                        style={"fontSize": "16px", "padding": "10px 20px", "marginLeft": "10px"}),
+            html.Div(id="steady-state-output", style={"marginTop": "10px"}),
+
+            html.Br(),
+            html.Label("Porównanie scenariuszy (puste pole - wartość z parametrów powyżej)"),
+            dcc.Dropdown(
+                id="cmp_op_modes",
+                options=operation_modes(),
+                value=[],
+                multi=True,
+                placeholder="Tryby pracy",
+                className="parameters-dropdown",
+            ),
+            dcc.Dropdown(
+                id="cmp_coolants",
+                options=["Powietrze", "Woda destylowana", "Glikol etylenowy 50%"],
+                value=[],
+                multi=True,
+                placeholder="Media chłodzące",
+                className="parameters-dropdown",
+            ),
+            dcc.Dropdown(
+                id="cmp_materials",
+                options=["Aluminium", "Miedź", "Szkło", "PVC"],
+                value=[],
+                multi=True,
+                placeholder="Materiał radiatorów CPU i GPU",
+                className="parameters-dropdown",
+            ),
+            html.Button("Porównaj scenariusze", id="compare-button", n_clicks=0,
+                        style={"fontSize": "16px", "padding": "10px 20px", "marginTop": "10px"}),
+            html.P(id="compare-progress-text", style={"marginTop": "10px"}),
 
         ]),
 
@@ -405,6 +615,8 @@ def main():
             html.P(id="progress-text", style={"textAlign": "center", "marginTop": "10px", "color": "black"}),
         ], style={"display": "none"}),
 
+        html.Div(id="kpi-table", style={"margin": "20px"}),
+
         html.Div(className="graphs", children=[
 
             dcc.Loading(
@@ -1,3 +1,30 @@
+import json
+import os
+
+# Tryby pracy wyznaczone automatycznie (tuning.py) - nazwa -> wagi funkcji kosztu
+OPERATION_MODES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "operation_modes.json")
+BUILTIN_OPERATION_MODES = ["Cicha praca", "Standard", "Wysoka wydajność"]
+
+
+def load_operation_modes():
+    if not os.path.exists(OPERATION_MODES_FILE):
+        return {}
+    with open(OPERATION_MODES_FILE, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_operation_mode(name, weights):
+    modes = load_operation_modes()
+    modes[name] = {key: float(value) for key, value in weights.items()}
+    with open(OPERATION_MODES_FILE, "w", encoding="utf-8") as f:
+        json.dump(modes, f, ensure_ascii=False, indent=2)
+
+
+def operation_modes():
+    return BUILTIN_OPERATION_MODES + [name for name in load_operation_modes()
+                                      if name not in BUILTIN_OPERATION_MODES]
+
+
 class Parameters:
     def __init__(self):
         # Materiały radiatorów 
@@ -36,8 +63,29 @@ class Parameters:
         # Czas symulacji i MPC 
         self.Ts = 1.0                # krok czasowy [s]
         self.simulation_steps = 2000  # liczba kroków symulacji
+        self.chunk_steps = 500       # liczba kroków w jednym fragmencie zapisywanym na dysk
         self.N = 8                   # horyzont MPC (liczba kroków predykcji)
 
+        # MPC wyzwalane zdarzeniami
+        self.event_triggered = False  # ponowna optymalizacja tylko po zdarzeniu
+        self.event_T_tol = 0.5        # dopuszczalna odchyłka stanu od predykcji [°C]
+        self.event_Q_tol = 1.0        # dopuszczalna zmiana obciążenia [W]
+
+        # MPC z ograniczonym czasem obliczeń
+        self.deadline = None          # limit czasu jednej optymalizacji [s], None - bez limitu
+        self.fallback_Kp = 10.0       # wzmocnienie P zapasowego regulatora [%/°C]
+        self.fallback_Ki = 0.5        # wzmocnienie I zapasowego regulatora [%/(°C·s)]
+
+        # Optymalizator MPC: "L-BFGS-B" (gradientowy), "MPPI" lub "CEM" (próbkujące)
+        self.solver = "L-BFGS-B"
+        self.samples = 1000           # liczba próbkowanych sekwencji PWM na krok
+        self.sampling_sigma = 20.0    # początkowe odchylenie próbek [%]
+        self.sampling_sigma_min = 2.0 # minimalne odchylenie próbek [%]
+        self.cem_iterations = 3       # liczba iteracji CEM na krok
+        self.cem_elite_frac = 0.05    # udział próbek elitarnych CEM
+        self.mppi_lambda = 0.1        # temperatura MPPI (względem rozrzutu kosztów)
+        self.sampling_seed = 0
+
         # Temperatura i PWM 
         self.T_amb = 25.0   # temperatura otoczenia [°C]
         self.T_limit = 75.0 # limit temperatury CPU/GPU [°C]
@@ -93,6 +141,12 @@ class Parameters:
         self.T_limit_RAM = 85.0  # limit RAM [°C]
         self.T_limit_AIR = 70.0  # limit powietrza [°C]
 
+        # Szafa (rack) - wiele obudów na wspólnej ścieżce powietrza
+        self.rack_nodes = 8                 # liczba obudów w szafie
+        self.rack_airflow = 0.05            # przepływ powietrza przez szafę [m³/s]
+        self.rack_recirculation = 0.3       # udział ciepła wylotowego trafiający na wlot kolejnej obudowy
+        self.rack_coordination_sweeps = 2   # liczba iteracji uzgadniania w MPC skoordynowanym
+
         # Radiacja włączona/wyłączona 
         self.enable_radiation = True
 
@@ -103,7 +157,12 @@ class Parameters:
 
     # Tryby pracy: wagi w funkcji kosztu 
     def set_operation_mode(self, mode: str):
-        if mode == "Cicha praca":
+        custom = load_operation_modes() if mode not in BUILTIN_OPERATION_MODES else {}
+        if mode in custom:
+            self.T_margin = 8.0
+            for key, value in custom[mode].items():
+                setattr(self, key, value)
+        elif mode == "Cicha praca":
             self.T_margin = 3.0      # bufor bezpieczeństwa dla temperatury
             self.n_margin  = 0.9     # mnożnik temepratury komforowej
             self.w_thermal = 100.0  # waga w funkcji kosztu temperatury
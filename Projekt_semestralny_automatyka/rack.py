@@ -0,0 +1,164 @@
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from controller import Controller
+from load_profile import cpu_load, gpu_load, ram_load
+from parameters import Parameters
+from simulation import fan_power
+
+
+class Rack:
+    def __init__(self, p, modes, phases=None):
+        self.p = p
+        self.modes = list(modes)
+        self.K = len(self.modes)
+        self.phases = np.zeros(self.K) if phases is None else np.asarray(phases, dtype=float)
+        self.controller = Controller(p)
+
+        # Pojemność cieplna strumienia powietrza w szafie [W/K]
+        air = p.COOLANT_DATA["Powietrze"]
+        self.C_flow = air["rho"] * air["cp"] * p.rack_airflow
+
+    def loads(self, k):
+        # Obciążenia [K x 3] - każda obudowa ma własny tryb i przesunięcie w czasie
+        Q = np.empty((self.K, 3))
+        for i, (mode, phase) in enumerate(zip(self.modes, self.phases)):
+            t = k + phase
+            Q[i] = (cpu_load(t, mode), gpu_load(t, mode), ram_load(t, mode))
+        return Q
+
+    def inlet_temperatures(self, Q_vent):
+        # Wlot obudowy i = otoczenie + część ciepła wylotowego obudów przed nią
+        rise = self.p.rack_recirculation * Q_vent / self.C_flow
+        return self.p.T_amb + np.concatenate(([0.0], np.cumsum(rise[:-1])))
+
+    def predict(self, T, u, Q, T_in):
+        return self.controller.predict_batch(T, u, Q[:, 0], Q[:, 1], Q[:, 2], T_amb=T_in, return_vent=True)
+
+
+def _solve_nodes(p, T, u_prev, Q, T_in, plans):
+    # Wspólne zadanie MPC dla bloku obudów; temperatura wlotu to warunek brzegowy modelu
+    plans = Controller(p).step_batch(T, u_prev, Q, T_in, plans)
+    return np.clip(plans[:, 0], 0.0, p.U_max), plans
+
+
+def _solve_all(executor, blocks, p, T, u_prev, Q, T_in, plans):
+    args = [(p, T[b], u_prev[b], Q[b], T_in[b], None if plans is None else plans[b]) for b in blocks]
+    if executor is None:
+        results = [_solve_nodes(*a) for a in args]
+    else:
+        results = list(executor.map(_solve_nodes, *zip(*args)))
+
+    u = np.empty_like(u_prev)
+    new_plans = np.empty((len(T), p.N, 3))
+    for b, (u_b, plans_b) in zip(blocks, results):
+        u[b] = u_b
+        new_plans[b] = plans_b
+    return u, new_plans
+
+
+def run_rack(p, modes, steps=None, phases=None, coordinated=False, workers=None, progress=None):
+    if steps is None:
+        steps = p.simulation_steps
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    rack = Rack(p, modes, phases)
+    K = rack.K
+
+    # Stan całej szafy w tablicach [K x ...]
+    T = np.full((K, 4), p.T_amb, dtype=float)
+    u_prev = np.zeros((K, 3))
+    Q_vent = np.zeros(K)
+    plans = None  # plany MPC [K x N x 3]
+
+    T_hist = np.empty((steps + 1, K, 4))
+    U_hist = np.empty((steps + 1, K, 3))
+    T_in_hist = np.empty((steps, K))
+    Q_hist = np.empty((steps, K, 3))
+    T_hist[0] = T
+    U_hist[0] = u_prev
+
+    blocks = np.array_split(np.arange(K), min(workers, K))
+    executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 and K > 1 else None
+    try:
+        for k in range(steps):
+            Q = rack.loads(k)
+            # Rzeczywisty wlot obiektu - z wylotu obudów w poprzednim kroku
+            T_in_plant = rack.inlet_temperatures(Q_vent)
+            u, new_plans = _solve_all(executor, blocks, p, T, u_prev, Q, T_in_plant, plans)
+
+            # MPC skoordynowane: regulator dostaje wlot liczony z wylotu przewidzianego dla planów
+            # pozostałych obudów; obiekt zawsze pracuje z rzeczywistym wlotem
+            if coordinated:
+                T_in_est = T_in_plant
+                for _ in range(p.rack_coordination_sweeps):
+                    _, Q_vent_pred = rack.predict(T, u, Q, T_in_est)
+                    T_in_est = rack.inlet_temperatures(Q_vent_pred)
+                    u, new_plans = _solve_all(executor, blocks, p, T, u_prev, Q, T_in_est, plans)
+
+            plans = new_plans
+            T, Q_vent = rack.predict(T, u, Q, T_in_plant)
+            u_prev = u
+
+            T_hist[k + 1] = T
+            U_hist[k + 1] = u
+            T_in_hist[k] = T_in_plant
+            Q_hist[k] = Q
+
+            if progress is not None:
+                progress(int((k + 1) / steps * 100), k + 1, steps)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    return {"T": T_hist, "U": U_hist, "T_in": T_in_hist, "Q": Q_hist}
+
+
+def rack_metrics(p, result):
+    T, U, Q = result["T"], result["U"], result["Q"]
+    limits = np.array([p.T_limit_CPU, p.T_limit_GPU, p.T_limit_AIR, p.T_limit_RAM])
+
+    fan_energy = fan_power(U).sum(axis=(0, 2)) * p.Ts  # [K] [J]
+    T_peak = T.max(axis=0)                             # [K x 4]
+    hot_node = T_peak.argmax(axis=0)                   # [CPU, GPU, AIR, RAM]
+    time_above = (T > limits).any(axis=2).sum(axis=0) * p.Ts
+
+    return {
+        "fan_energy_total": fan_energy.sum(),
+        "fan_energy": fan_energy,
+        "load_energy_total": Q.sum() * p.Ts,
+        "T_peak": T_peak.max(axis=0),
+        "hot_node": hot_node,
+        "time_above_limit": time_above,
+        "T_in_max": result["T_in"].max(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Symulacja szafy z wieloma obudowami")
+    parser.add_argument("--nodes", type=int, default=None)
+    parser.add_argument("--mode", default="Stres")
+    parser.add_argument("--steps", type=int, default=200)
+    parser.add_argument("--coordinated", action="store_true")
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    p = Parameters()
+    K = args.nodes or p.rack_nodes
+    result = run_rack(p, [args.mode] * K, args.steps, phases=np.arange(K) * 10.0,
+                      coordinated=args.coordinated, workers=args.workers)
+    metrics = rack_metrics(p, result)
+
+    print(f"Energia wentylatorów: {metrics['fan_energy_total']:.1f} J")
+    print(f"Maks. temperatura wlotu: {metrics['T_in_max']:.1f} °C")
+    for name, T_peak, node in zip(("CPU", "GPU", "powietrze", "RAM"), metrics["T_peak"], metrics["hot_node"]):
+        print(f"Gorący punkt {name}: {T_peak:.1f} °C (obudowa {node})")
+    print(f"Czas powyżej limitu: maks. {metrics['time_above_limit'].max():.0f} s")
+
+
+if __name__ == "__main__":
+    main()
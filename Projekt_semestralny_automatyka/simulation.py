@@ -0,0 +1,289 @@
+import argparse
+import copy
+import hashlib
+import json
+import os
+import tempfile
+
+import numpy as np
+
+from controller import Controller
+from load_profile import cpu_load, gpu_load, ram_load
+from parameters import Parameters
+
+RUNS_DIR = "./runs"
+
+# Przybliżona moc maksymalna wentylatorów [W]
+P_max_CPU = 5.0
+P_max_GPU = 7.0
+P_max_CASE = 5.0
+
+# Przedziały histogramu czasu obliczeń regulatora [s]
+LATENCY_BINS = np.logspace(-4, 1, 26)
+
+
+def run_dir_for(config):
+    # Katalog przebiegu zależy tylko od konfiguracji - ponowne uruchomienie wznawia przebieg
+    key = json.dumps(config, sort_keys=True, default=str)
+    return os.path.join(RUNS_DIR, hashlib.sha1(key.encode()).hexdigest()[:16])
+
+
+def _chunk_path(run_dir, index):
+    return os.path.join(run_dir, f"chunk_{index:06d}.npz")
+
+
+def _save_atomic(path, **arrays):
+    # Unikalny plik tymczasowy dla każdego zapisującego - równoległe przebiegi tej samej konfiguracji
+    # (np. symulacja i scenariusz porównania) nie nadpisują sobie plików
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=os.path.basename(path) + ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            np.savez(f, **arrays)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
+def load_checkpoint(run_dir):
+    path = os.path.join(run_dir, "checkpoint.npz")
+    if not os.path.exists(path):
+        return None
+    with np.load(path) as data:
+        return {
+            "k": int(data["k"]),
+            "chunk": int(data["chunk"]),
+            "T": data["T"].copy(),
+            "u_prev": data["u_prev"].copy(),
+            "controller": {name: data[name].copy() for name in data.files
+                           if name not in ("k", "chunk", "T", "u_prev")},
+        }
+
+
+def run_simulation(p, mode, run_dir, total_steps=None, progress=None):
+    if total_steps is None:
+        total_steps = p.simulation_steps
+    os.makedirs(run_dir, exist_ok=True)
+
+    controller = Controller(p)
+
+    # Stan początkowy albo wznowienie z ostatniego punktu kontrolnego
+    state = load_checkpoint(run_dir)
+    if state is None:
+        k, chunk = 0, 0
+        T = np.full(4, p.T_amb, dtype=float)
+        u_prev = np.zeros(3)
+    else:
+        k, chunk = state["k"], state["chunk"]
+        T, u_prev = state["T"], state["u_prev"]
+        controller.set_state(state["controller"])
+
+    # Bufory jednego fragmentu - zużycie pamięci nie zależy od horyzontu
+    n_chunk = p.chunk_steps
+    t_buf = np.empty(n_chunk)
+    T_buf = np.empty((n_chunk, 4))
+    U_buf = np.empty((n_chunk, 3))
+    Q_buf = np.empty((n_chunk, 3))
+    S_buf = np.empty(n_chunk, dtype=bool)  # czy w kroku uruchomiono optymalizator
+    J_buf = np.empty(n_chunk)              # zrealizowany koszt etapu
+    L_buf = np.empty(n_chunk)              # czas obliczeń regulatora [s]
+    M_buf = np.empty(n_chunk, dtype=bool)  # przekroczenie limitu czasu
+    F_buf = np.empty(n_chunk, dtype=bool)  # użycie zapasowego regulatora PI
+    T_comfort = controller.comfort_temperatures()
+
+    last_percent = -1
+    while k <= total_steps:
+        n = min(n_chunk, total_steps + 1 - k)
+        for i in range(n):
+            # Obciążenie cieplne
+            Qc = cpu_load(k, mode)
+            Qg = gpu_load(k, mode)
+            Qr = ram_load(k, mode)
+
+            # MPC - obliczenie optymalnego sterowania
+            u = controller.control(T, u_prev, Qc, Qg, Qr)
+            u = np.clip(u, 0.0, p.U_max)
+
+            # Predykcja nowego stanu
+            T = controller.predict(T, u, Qc, Qg, Qr)
+            S_buf[i] = controller.last_solved
+            J_buf[i] = np.sum(controller.stage_cost(T, u, u_prev, T_comfort))
+            L_buf[i] = controller.last_latency
+            M_buf[i] = controller.last_deadline_miss
+            F_buf[i] = controller.last_fallback
+
+            t_buf[i] = (k + 1) * p.Ts
+            T_buf[i] = T
+            U_buf[i] = u
+            Q_buf[i] = (Qc, Qg, Qr)
+
+            u_prev = u
+            k += 1
+
+            percent = int((k - 1) / max(total_steps, 1) * 100)
+            if progress is not None and percent != last_percent:
+                progress(percent, k - 1, total_steps)
+                last_percent = percent
+
+        # Zapis fragmentu, a dopiero potem punktu kontrolnego
+        _save_atomic(_chunk_path(run_dir, chunk), t=t_buf[:n], T=T_buf[:n], U=U_buf[:n], Q=Q_buf[:n],
+                     S=S_buf[:n], J=J_buf[:n], L=L_buf[:n], M=M_buf[:n], F=F_buf[:n])
+        chunk += 1
+        _save_atomic(os.path.join(run_dir, "checkpoint.npz"),
+                     k=k, chunk=chunk, T=T, u_prev=u_prev, **controller.get_state())
+
+    return run_dir
+
+
+def iter_chunks(run_dir):
+    chunk = 0
+    while os.path.exists(_chunk_path(run_dir, chunk)):
+        with np.load(_chunk_path(run_dir, chunk)) as data:
+            yield {name: data[name] for name in data.files}
+        chunk += 1
+
+
+def fan_power(U):
+    U = np.asarray(U) / 100
+    return np.stack([U[..., 0] ** 3 * P_max_CPU,
+                     U[..., 1] ** 3 * P_max_GPU,
+                     U[..., 2] ** 3 * P_max_CASE], axis=-1)
+
+
+def noise_dB(p, U):
+    U = np.asarray(U)
+    CPU_dB = Controller.fan_noise_dB(U[..., 0], p.L_max_CPU)
+    GPU_dB = Controller.fan_noise_dB(U[..., 1], p.L_max_GPU)
+    CASE_dB = Controller.fan_noise_dB(U[..., 2], p.L_max_case)
+    total_dB = 10 * np.log10(10 ** (CPU_dB / 10) + 10 ** (GPU_dB / 10) + 10 ** (CASE_dB / 10))
+    return np.stack([CPU_dB, GPU_dB, CASE_dB, total_dB], axis=-1)
+
+
+def load_history(run_dir, max_points=5000):
+    # Decymacja przy odczycie - do wykresów wystarczy ograniczona liczba punktów
+    state = load_checkpoint(run_dir)
+    if state is None:
+        return {"t": np.empty(0), "T": np.empty((0, 4)), "U": np.empty((0, 3)), "Q": np.empty((0, 3))}
+    stride = max(1, int(np.ceil(state["k"] / max_points)))
+
+    parts = {"t": [], "T": [], "U": [], "Q": []}
+    offset = 0
+    for data in iter_chunks(run_dir):
+        n = len(data["t"])
+        idx = np.arange((-offset) % stride, n, stride)
+        for name in parts:
+            parts[name].append(data[name][idx])
+        offset += n
+    return {name: np.concatenate(values) for name, values in parts.items()}
+
+
+def summarize(p, run_dir):
+    # Strumieniowe wskaźniki po wszystkich fragmentach
+    limits = np.array([p.T_limit_CPU, p.T_limit_GPU, p.T_limit_AIR, p.T_limit_RAM])
+    steps = 0
+    T_max = np.full(4, -np.inf)
+    time_above = np.zeros(4)
+    energy = np.zeros(3)
+    dB_sum = 0.0
+    dB_max = -np.inf
+    solves = 0
+    cost = 0.0
+    misses = 0
+    fallbacks = 0
+    latency_hist = np.zeros(len(LATENCY_BINS) - 1, dtype=int)
+    latency_max = 0.0
+
+    for data in iter_chunks(run_dir):
+        steps += len(data["t"])
+        T_max = np.maximum(T_max, data["T"].max(axis=0))
+        time_above += (data["T"] > limits).sum(axis=0) * p.Ts
+        energy += fan_power(data["U"]).sum(axis=0) * p.Ts
+        total_dB = noise_dB(p, data["U"])[:, 3]
+        dB_sum += total_dB.sum()
+        dB_max = max(dB_max, total_dB.max())
+        solves += data["S"].sum()
+        cost += data["J"].sum()
+        misses += data["M"].sum()
+        fallbacks += data["F"].sum()
+        latency_hist += np.histogram(np.clip(data["L"], LATENCY_BINS[0], LATENCY_BINS[-1]), LATENCY_BINS)[0]
+        latency_max = max(latency_max, data["L"].max())
+
+    return {
+        "steps": steps,
+        "T_max": T_max,                 # [CPU, GPU, AIR, RAM] [°C]
+        "time_above_limit": time_above,  # [s]
+        "fan_energy": energy,            # [CPU, GPU, CASE] [J]
+        "mean_dB": dB_sum / max(steps, 1),
+        "max_dB": dB_max,
+        "trigger_rate": solves / max(steps, 1),  # udział kroków z optymalizacją
+        "closed_loop_cost": cost,
+        "deadline_misses": misses,
+        "fallbacks": fallbacks,
+        "latency_max": latency_max,       # [s]
+        "latency_hist": latency_hist,     # liczności w przedziałach LATENCY_BINS
+    }
+
+
+def compare_event_triggered(p, mode, steps=None):
+    # MPC wyzwalane zdarzeniami względem optymalizacji w każdym kroku
+    if steps is None:
+        steps = p.simulation_steps
+    summaries = {}
+    for event_triggered in (False, True):
+        p_run = copy.copy(p)
+        p_run.event_triggered = event_triggered
+        run_dir = run_dir_for({"params": vars(p_run), "mode": mode, "steps": steps})
+        run_simulation(p_run, mode, run_dir, steps)
+        summaries[event_triggered] = summarize(p_run, run_dir)
+
+    full, event = summaries[False], summaries[True]
+    return {
+        "trigger_rate": event["trigger_rate"],
+        "cost_full": full["closed_loop_cost"],
+        "cost_event": event["closed_loop_cost"],
+        "cost_increase": event["closed_loop_cost"] / full["closed_loop_cost"] - 1,
+    }
+
+
+def compare_solvers(p, mode, steps=None, solvers=("L-BFGS-B", "MPPI", "CEM")):
+    # Porównanie optymalizatorów MPC w zamkniętej pętli
+    if steps is None:
+        steps = p.simulation_steps
+    results = {}
+    for solver in solvers:
+        p_run = copy.copy(p)
+        p_run.solver = solver
+        run_dir = run_dir_for({"params": vars(p_run), "mode": mode, "steps": steps})
+        run_simulation(p_run, mode, run_dir, steps)
+        results[solver] = summarize(p_run, run_dir)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Porównanie optymalizatorów MPC")
+    parser.add_argument("--mode", default="GRA3")
+    parser.add_argument("--steps", type=int, default=300)
+    parser.add_argument("--samples", type=int, default=None)
+    parser.add_argument("--event", action="store_true",
+                        help="porównanie MPC wyzwalanego zdarzeniami z optymalizacją w każdym kroku")
+    args = parser.parse_args()
+
+    p = Parameters()
+    if args.samples:
+        p.samples = args.samples
+
+    if args.event:
+        r = compare_event_triggered(p, args.mode, args.steps)
+        print(f"Optymalizacja w {r['trigger_rate'] * 100:.1f}% kroków")
+        print(f"Koszt zamkniętej pętli: {r['cost_full']:.4g} (każdy krok) -> {r['cost_event']:.4g} (zdarzenia),"
+              f" zmiana {r['cost_increase'] * 100:+.2f}%")
+        return
+
+    for solver, s in compare_solvers(p, args.mode, args.steps).items():
+        print(f"{solver:9s} koszt {s['closed_loop_cost']:.4g} | T maks. CPU {s['T_max'][0]:.1f} °C"
+              f" GPU {s['T_max'][1]:.1f} °C | {s['mean_dB']:.1f} dB | {s['fan_energy'].sum():.0f} J"
+              f" | czas maks. {s['latency_max'] * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+import argparse
+
+from controller import Controller
+from load_profile import cpu_load, gpu_load, ram_load
+from parameters import Parameters
+
+
+def solve_operating_point(p, mode, t=0.0):
+    # Ustalony punkt pracy dla obciążenia trybu `mode` w chwili t
+    Qc = cpu_load(t, mode)
+    Qg = gpu_load(t, mode)
+    Qr = ram_load(t, mode)
+
+    u, T = Controller(p).steady_state(Qc, Qg, Qr)
+    return {
+        "u": u,  # [CPU, GPU, CASE] [%]
+        "T": T,  # [CPU, GPU, AIR, RAM] [°C]
+        "Q": (Qc, Qg, Qr),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ustalony punkt pracy chłodzenia")
+    parser.add_argument("--mode", default="Stres")
+    parser.add_argument("--coolant", default="Powietrze")
+    parser.add_argument("--op-mode", default="Standard")
+    parser.add_argument("--materials", nargs=3, default=["Miedź", "Miedź", "Aluminium"],
+                        metavar=("CPU", "GPU", "RAM"))
+    parser.add_argument("--T-amb", type=float, default=25.0)
+    parser.add_argument("--no-radiation", action="store_true")
+    args = parser.parse_args()
+
+    p = Parameters()
+    p.T_amb = args.T_amb
+    p.enable_radiation = not args.no_radiation
+    p.update_heatsink_material(*args.materials)
+    p.update_coolant(args.coolant)
+    p.set_operation_mode(args.op_mode)
+
+    result = solve_operating_point(p, args.mode)
+    u, T = result["u"], result["T"]
+    print(f"PWM [%]: CPU {u[0]:.1f}  GPU {u[1]:.1f}  obudowa {u[2]:.1f}")
+    print(f"T [°C]:  CPU {T[0]:.1f}  GPU {T[1]:.1f}  powietrze {T[2]:.1f}  RAM {T[3]:.1f}")
+
+
+if __name__ == "__main__":
+    main()
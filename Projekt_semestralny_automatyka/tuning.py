@@ -0,0 +1,164 @@
+import argparse
+import copy
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from scipy.stats import qmc
+
+from load_profile import available_modes, is_trace_mode, load_trace
+from parameters import Parameters, save_operation_mode
+from simulation import run_dir_for, run_simulation, summarize
+
+# Przestrzeń wag: (nazwa, min, max, skala logarytmiczna)
+WEIGHT_SPACE = [
+    ("w_thermal", 10.0, 3000.0, True),
+    ("w_energy", 1e-3, 1.0, True),
+    ("w_noise", 1e-2, 100.0, True),
+    ("w_smooth", 1e-2, 50.0, True),
+    ("n_margin", 0.4, 0.95, False),
+]
+
+
+def to_weights(x):
+    # Punkt z kostki jednostkowej -> wagi funkcji kosztu
+    weights = {}
+    for xi, (name, lo, hi, log) in zip(x, WEIGHT_SPACE):
+        if log:
+            weights[name] = float(np.exp(np.log(lo) + xi * (np.log(hi) - np.log(lo))))
+        else:
+            weights[name] = float(lo + xi * (hi - lo))
+    return weights
+
+
+def quiet_objective(summaries):
+    # Minimalny średni hałas przy zerowym czasie powyżej limitów temperatury
+    time_above = sum(s["time_above_limit"].sum() for s in summaries)
+    mean_dB = np.mean([s["mean_dB"] for s in summaries])
+    return mean_dB + (1e3 + time_above if time_above > 0 else 0.0)
+
+
+def energy_objective(summaries):
+    time_above = sum(s["time_above_limit"].sum() for s in summaries)
+    energy = sum(s["fan_energy"].sum() for s in summaries)
+    return energy + (1e6 + time_above if time_above > 0 else 0.0)
+
+
+OBJECTIVES = {"cisza": quiet_objective, "energia": energy_objective}
+
+
+def _evaluate(p, weights, mode, steps):
+    # Jeden przebieg zamkniętej pętli; katalog przebiegu zależy od wag, więc wynik jest buforowany na dysku
+    p = copy.copy(p)
+    for name, value in weights.items():
+        setattr(p, name, value)
+
+    # Ślad telemetrii ładowany w procesie roboczym; siatka śladu jest częścią klucza bufora
+    trace_grid = None
+    if is_trace_mode(mode):
+        trace = load_trace(mode, p.Ts)
+        steps = min(steps, len(trace) - 1)
+        trace_grid = trace.grid.filename
+
+    run_dir = run_dir_for({"params": vars(p), "mode": mode, "steps": steps, "trace": trace_grid})
+    run_simulation(p, mode, run_dir, steps)
+    return summarize(p, run_dir)
+
+
+class Tuner:
+    def __init__(self, p, modes, objective=quiet_objective, steps=600, workers=None, seed=0):
+        unknown = [mode for mode in modes if mode not in available_modes()]
+        if unknown:
+            raise ValueError(f"Unknown load profiles: {', '.join(unknown)}")
+
+        # Siatki śladów budowane raz, zanim procesy robocze zaczną z nich czytać
+        for mode in modes:
+            if is_trace_mode(mode):
+                load_trace(mode, p.Ts)
+
+        self.p = p
+        self.modes = list(modes)
+        self.objective = objective
+        self.steps = steps
+        self.workers = workers or os.cpu_count() or 1
+        self.rng = np.random.default_rng(seed)
+        self.cache = {}    # punkt (zaokrąglony) -> wartość celu
+        self.history = []  # (wagi, wartość celu)
+
+    def evaluate(self, points):
+        # Ocena wielu punktów równolegle - każda para (punkt, profil obciążenia) to osobne zadanie
+        points = [tuple(np.round(np.clip(x, 0.0, 1.0), 6)) for x in points]
+        todo = list(dict.fromkeys(x for x in points if x not in self.cache))
+
+        jobs = [(x, mode) for x in todo for mode in self.modes]
+        with ProcessPoolExecutor(max_workers=self.workers) as executor:
+            summaries = list(executor.map(_evaluate,
+                                          [self.p] * len(jobs),
+                                          [to_weights(x) for x, _ in jobs],
+                                          [mode for _, mode in jobs],
+                                          [self.steps] * len(jobs)))
+
+        for i, x in enumerate(todo):
+            value = float(self.objective(summaries[i * len(self.modes):(i + 1) * len(self.modes)]))
+            self.cache[x] = value
+            self.history.append((to_weights(x), value))
+
+        return np.array([self.cache[x] for x in points])
+
+    def search(self, samples=16, method="lhs"):
+        # Przeszukiwanie globalne: hipersześcian łaciński lub próbkowanie losowe
+        d = len(WEIGHT_SPACE)
+        if method == "lhs":
+            points = qmc.LatinHypercube(d=d, seed=self.rng).random(samples)
+        else:
+            points = self.rng.random((samples, d))
+        values = self.evaluate(points)
+        best = int(np.argmin(values))
+        return points[best], values[best]
+
+    def refine(self, x, value, step=0.1, min_step=0.0125, max_iter=20):
+        # Lokalne przeszukiwanie wzorcem (kroki ±step po każdej osi oceniane równolegle)
+        x = np.asarray(x, dtype=float)
+        d = len(x)
+        for _ in range(max_iter):
+            if step < min_step:
+                break
+            directions = np.vstack((np.eye(d), -np.eye(d))) * step
+            candidates = np.clip(x + directions, 0.0, 1.0)
+            values = self.evaluate(candidates)
+            best = int(np.argmin(values))
+            if values[best] < value:
+                x, value = candidates[best], values[best]
+            else:
+                step /= 2
+        return x, value
+
+    def tune(self, samples=16, method="lhs"):
+        x, value = self.search(samples, method)
+        x, value = self.refine(x, value)
+        return to_weights(x), value
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Automatyczny dobór wag MPC")
+    parser.add_argument("--name", required=True, help="nazwa nowego trybu pracy")
+    parser.add_argument("--profiles", nargs="+", default=["Standard", "Stres", "GRA1"], choices=available_modes(),
+                        metavar="PROFILE", help="profile obciążenia (wbudowane albo 'Ślad: <plik>')")
+    parser.add_argument("--objective", choices=sorted(OBJECTIVES), default="cisza")
+    parser.add_argument("--samples", type=int, default=16)
+    parser.add_argument("--method", choices=["lhs", "random"], default="lhs")
+    parser.add_argument("--steps", type=int, default=600)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    tuner = Tuner(Parameters(), args.profiles, OBJECTIVES[args.objective], args.steps, args.workers)
+    weights, value = tuner.tune(args.samples, args.method)
+    save_operation_mode(args.name, weights)
+
+    print(f"Zapisano tryb pracy '{args.name}' (cel = {value:.3f})")
+    for name, w in weights.items():
+        print(f"  {name} = {w:.4g}")
+
+
+if __name__ == "__main__":
+    main()
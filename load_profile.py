@@ -1,6 +1,153 @@
+import hashlib
+import os
+import tempfile
+
 import numpy as np
 
+# Profile oparte na rzeczywistej telemetrii (pliki CSV / Parquet z kolumnami t, cpu, gpu, ram)
+TRACE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "traces")
+TRACE_PREFIX = "Ślad: "
+TRACE_COLUMNS = ("t", "cpu", "gpu", "ram")
+TRACE_EXTENSIONS = (".csv", ".parquet")
+
+# Wbudowane profile obciążenia
+LOAD_MODES = ["Bezczynny", "Standard", "Stres", "Stres2", "Stres3", "GRA1", "GRA2", "GRA3"]
+
+# Załadowane ślady (nazwa trybu -> TraceProfile)
+_TRACES = {}
+
+
+class TraceProfile:
+    def __init__(self, path, Ts=1.0, t_start=None, t_end=None, chunksize=500_000):
+        self.path = path
+        self.Ts = Ts
+        self.t_start = t_start
+        self.t_end = t_end
+        self.chunksize = chunksize
+
+        grid_path = self._grid_path()
+        if not os.path.exists(grid_path):
+            self._build_grid(grid_path)
+
+        # Siatka [n x 3] mapowana z dysku - nie trzyma całego śladu w RAM
+        if os.path.getsize(grid_path) == 0:
+            raise ValueError(f"Trace {path} has no samples in the selected window.")
+        self.grid = np.memmap(grid_path, dtype=np.float64, mode="r").reshape(-1, 3)
+
+    def __len__(self):
+        return self.grid.shape[0]
+
+    def at(self, k, column):
+        # k - numer kroku symulacji (próbka siatki Ts), poza zakresem utrzymywana jest ostatnia próbka
+        k = min(max(int(round(k)), 0), len(self) - 1)
+        return float(self.grid[k, column])
+
+    def _grid_path(self):
+        st = os.stat(self.path)
+        key = f"{os.path.abspath(self.path)}|{st.st_mtime_ns}|{st.st_size}|{self.Ts}|{self.t_start}|{self.t_end}"
+        digest = hashlib.sha1(key.encode()).hexdigest()[:16]
+        directory, name = os.path.split(self.path)
+        return os.path.join(directory, f".{name}.{digest}.f64")
+
+    def _read_chunks(self):
+        if self.path.endswith(".parquet"):
+            import pyarrow.parquet as pq
+
+            for batch in pq.ParquetFile(self.path).iter_batches(batch_size=self.chunksize,
+                                                                 columns=list(TRACE_COLUMNS)):
+                # Kolumny po nazwie - kolejność w schemacie pliku może być dowolna
+                yield (_to_seconds(batch.column(TRACE_COLUMNS[0]).to_numpy()),
+                       np.column_stack([batch.column(name).to_numpy() for name in TRACE_COLUMNS[1:]]).astype(np.float64))
+        else:
+            import pandas as pd
+
+            for chunk in pd.read_csv(self.path, usecols=list(TRACE_COLUMNS), chunksize=self.chunksize):
+                yield (_to_seconds(chunk[TRACE_COLUMNS[0]].to_numpy()),
+                       chunk[list(TRACE_COLUMNS[1:])].to_numpy(dtype=np.float64))
+
+    def _build_grid(self, grid_path):
+        # Unikalny plik tymczasowy - kilka procesów może budować tę samą siatkę jednocześnie
+        directory, name = os.path.split(grid_path)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=name + ".", suffix=".tmp")
+        try:
+            self._write_grid(fd)
+            os.replace(tmp_path, grid_path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+
+    def _write_grid(self, fd):
+        # Strumieniowe przepróbkowanie (interpolacja liniowa) na siatkę co Ts,
+        # okno [t_start, t_end] liczone od pierwszej próbki śladu
+        Ts, t_start, t_end = self.Ts, self.t_start, self.t_end
+        origin = t0 = None
+        n = 0
+        prev_t = prev_v = None
+
+        with os.fdopen(fd, "wb") as f:
+            for t, v in self._read_chunks():
+                if len(t) == 0:
+                    continue
+                if origin is None:
+                    origin = t[0]
+                    t_start = None if t_start is None else origin + t_start
+                    t_end = None if t_end is None else origin + t_end
+                if prev_t is not None:
+                    t = np.concatenate(([prev_t], t))
+                    v = np.vstack((prev_v, v))
+                prev_t, prev_v = t[-1], v[-1]
+
+                if t0 is None:
+                    if t_start is not None and t[-1] < t_start:
+                        continue
+                    t0 = t[0] if t_start is None else max(t_start, t[0])
+
+                t_hi = t[-1] if t_end is None else min(t[-1], t_end)
+                count = int(np.floor((t_hi - (t0 + n * Ts)) / Ts + 1e-9)) + 1
+                if count > 0:
+                    t_grid = t0 + (n + np.arange(count)) * Ts
+                    out = np.column_stack([np.interp(t_grid, t, v[:, j]) for j in range(3)])
+                    out.tofile(f)
+                    n += count
+
+                if t_end is not None and t[-1] >= t_end:
+                    break
+
+
+def _to_seconds(t):
+    if np.issubdtype(t.dtype, np.number):
+        return t.astype(np.float64)
+    # Znaczniki czasu -> sekundy
+    return t.astype("datetime64[ns]").astype(np.int64) / 1e9
+
+
+def available_traces():
+    if not os.path.isdir(TRACE_DIR):
+        return []
+    return sorted(TRACE_PREFIX + name for name in os.listdir(TRACE_DIR)
+                  if name.endswith(TRACE_EXTENSIONS) and not name.startswith("."))
+
+
+def available_modes():
+    return LOAD_MODES + available_traces()
+
+
+def is_trace_mode(mode):
+    return mode.startswith(TRACE_PREFIX)
+
+
+def load_trace(mode, Ts=1.0, t_start=None, t_end=None):
+    path = os.path.join(TRACE_DIR, mode[len(TRACE_PREFIX):])
+    profile = TraceProfile(path, Ts, t_start, t_end)
+    _TRACES[mode] = profile
+    return profile
+
+
 def cpu_load(t, mode):
+    # Dla śladów t to numer kroku symulacji
+    if mode in _TRACES:
+        return _TRACES[mode].at(t, 0)
+
     if mode == "Bezczynny":
         return 30.0
 
@@ -28,6 +175,10 @@ def cpu_load(t, mode):
     return 60.0
 
 def gpu_load(t, mode):
+    # Dla śladów t to numer kroku symulacji
+    if mode in _TRACES:
+        return _TRACES[mode].at(t, 1)
+
     if mode == "Bezczynny":
         return 20.0
 
@@ -55,6 +206,10 @@ def gpu_load(t, mode):
     return 100.0
 
 def ram_load(t, mode):
+    # Dla śladów t to numer kroku symulacji
+    if mode in _TRACES:
+        return _TRACES[mode].at(t, 2)
+
     if mode == "Bezczynny":
         return 5.0
     elif mode == "Stres":